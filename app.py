@@ -1,25 +1,119 @@
-from collections import Counter
+from functools import lru_cache
+from itertools import combinations_with_replacement, repeat
 import random
+import sys
 import math
+import operator
 
 N_NUMEROS = 30    
 DECIMALES = 5       
 CONFIANZA = 0.95   
 
-# Valor crítico de chi-cuadrado para:
-CHI2_CRITICO_95_G6 = 12.5916
-
-# (sobre 10^5 combinaciones posibles)
-PROBS = {
-    "todos_distintos": 0.3024,
-    "un_par":          0.5040,
-    "dos_pares":       0.1080,
-    "tercia":          0.0720,
-    "full_house":      0.0090,
-    "poker":           0.0045,
-    "quintilla":       0.0001,
+# Valores críticos de chi-cuadrado al 95% por grados de libertad
+CHI2_CRITICO_95 = {
+    1: 3.8415,
+    2: 5.9915,
+    3: 7.8147,
+    4: 9.4877,
+    5: 11.0705,
+    6: 12.5916,
 }
 
+# Frecuencia esperada mínima por clase; las clases por debajo se agrupan
+UMBRAL_ESPERADA = 4
+
+# Probabilidades por número de decimales k (sobre 10^k combinaciones posibles);
+# con k < 5 no hay full ni quintilla
+PROBS_POR_K = {
+    3: {
+        "todos_distintos": 0.72,
+        "un_par":          0.27,
+        "tercia":          0.01,
+    },
+    4: {
+        "todos_distintos": 0.504,
+        "un_par":          0.432,
+        "dos_pares":       0.027,
+        "tercia":          0.036,
+        "poker":           0.001,
+    },
+    5: {
+        "todos_distintos": 0.3024,
+        "un_par":          0.5040,
+        "dos_pares":       0.1080,
+        "tercia":          0.0720,
+        "full_house":      0.0090,
+        "poker":           0.0045,
+        "quintilla":       0.0001,
+    },
+}
+PROBS = PROBS_POR_K[5]
+
+# Mismas tablas como tuplas alineadas, para indexar por posición y no por clave
+CATEGORIAS_POR_K = {k: tuple(p) for k, p in PROBS_POR_K.items()}
+P_POR_K = {k: tuple(p.values()) for k, p in PROBS_POR_K.items()}
+
+# 10^k precalculado para cada k soportado
+POTENCIAS = {k: 10 ** k for k in PROBS_POR_K}
+
+# (mayor repetición, segunda mayor repetición) -> categoría
+# Las dos multiplicidades más altas bastan para distinguir cada mano.
+FIRMA_A_CATEGORIA = {
+    (1, 1): "todos_distintos",
+    (2, 1): "un_par",
+    (2, 2): "dos_pares",
+    (3, 1): "tercia",
+    (3, 2): "full_house",
+    (4, 1): "poker",
+    (5, 0): "quintilla",
+    # manos de menos de 5 dígitos
+    (3, 0): "tercia",
+    (4, 0): "poker",
+}
+
+# Mismo mapeo como tabla plana indexada por la firma entera top1 * 8 + top2;
+# cada entrada es el índice de la categoría en CATEGORIAS (-1 si no es válida).
+CATEGORIAS = tuple(PROBS)
+TABLA_FIRMAS = [-1] * 64
+for (_t1, _t2), _cat in FIRMA_A_CATEGORIA.items():
+    TABLA_FIRMAS[_t1 * 8 + _t2] = CATEGORIAS.index(_cat)
+
+# Posición en CATEGORIAS de cada categoría de CATEGORIAS_POR_K[k]
+INDICES_POR_K = {
+    k: tuple(CATEGORIAS.index(cat) for cat in cats)
+    for k, cats in CATEGORIAS_POR_K.items()
+}
+
+# Histograma empaquetado: el contador del dígito d ocupa los bits 4d..4d+3
+# (cada contador vale a lo sumo 5), así que contar un dígito es una suma.
+BITS_DIGITO = [1 << (4 * d) for d in range(10)]
+
+
+def _indice_de_conteos(conteos) -> int:
+    """Índice de categoría (en CATEGORIAS) de unos conteos de dígitos; -1 si no es válida."""
+    top1 = top2 = 0
+    for c in conteos:
+        if c > top1:
+            top1, top2 = c, top1
+        elif c > top2:
+            top2 = c
+    if top1 >= 8:
+        return -1
+    return TABLA_FIRMAS[top1 * 8 + top2]
+
+
+def _indice_de_histograma(h: int) -> int:
+    """Índice de categoría (en CATEGORIAS) de un histograma empaquetado."""
+    return _indice_de_conteos([(h >> (4 * d)) & 0xF for d in range(10)])
+
+
+# Todos los histogramas posibles de k dígitos (multiconjuntos de 0-9) -> categoría
+HISTOGRAMA_A_INDICE = {}
+for _k in PROBS_POR_K:
+    for _mano in combinations_with_replacement(range(10), _k):
+        _h = sum(BITS_DIGITO[d] for d in _mano)
+        HISTOGRAMA_A_INDICE[_h] = _indice_de_histograma(_h)
+
 # Para impresión bonita en español y en el orden de la tabla
 DISPLAY_ORDER = [
     "dos_pares",
@@ -41,75 +135,218 @@ DISPLAY_NAME = {
     "quintilla":       "QUINTILLA",
 }
 
+# Abreviaturas para nombrar grupos fusionados sin salir de las 68 columnas
+DISPLAY_ABREV = {
+    "todos_distintos": "TD",
+    "un_par":          "1P",
+    "dos_pares":       "DP",
+    "tercia":          "T",
+    "full_house":      "FH",
+    "poker":           "P",
+    "quintilla":       "Q",
+}
+ANCHO_NOMBRE_MAX = 24
+
 
-def extraer_digitos(u: float, k: int = 5) -> str:
-    """Devuelve los primeros k dígitos decimales de un número en [0,1)."""
-    n = int(u * (10 ** k))
-    return f"{n:0{k}d}"
+def generar_numeros(n: int, semilla=None) -> list:
+    """Genera n números pseudoaleatorios uniformes en [0,1)."""
+    aleatorio = random.Random(semilla).random
+    return [aleatorio() for _ in repeat(None, n)]
 
 
-def clasificar_poker(digitos: str) -> str:
-    """Clasifica una cadena de 5 dígitos en categoría de póker."""
-    c = Counter(digitos)
-    rep = sorted(c.values(), reverse=True)
+def escalar(u: float, k: int = 5) -> int:
+    """
+    Devuelve los primeros k decimales de u como entero (u * 10^k truncado).
 
-    if rep == [1, 1, 1, 1, 1]:
-        return "todos_distintos"
-    if rep == [2, 1, 1, 1]:
-        return "un_par"
-    if rep == [2, 2, 1]:
-        return "dos_pares"
-    if rep == [3, 1, 1]:
-        return "tercia"
-    if rep == [3, 2]:
-        return "full_house"
-    if rep == [4, 1]:
-        return "poker"
-    if rep == [5]:
-        return "quintilla"
-    return "otra"
+    Se corrige el error de representación binaria: 0.29 se guarda como
+    0.28999999999999998, pero es el float más cercano a 29000 / 10^5, así que
+    cuenta como 29000 y no como 28999.
+    """
+    escala = 10 ** k
+    x = int(u * escala)
+    if (x + 1) / escala <= u:
+        x += 1
+    elif x / escala > u:
+        x -= 1
+    return x
+
+
+def contar_digitos(u: float, k: int = 5) -> list:
+    """Cuenta cuántas veces aparece cada dígito 0-9 en los primeros k decimales de u."""
+    x = escalar(u, k)
+    conteos = [0] * 10
+    for _ in range(k):
+        conteos[x % 10] += 1
+        x //= 10
+    return conteos
+
+
+# Con k <= 5 hay a lo sumo 2937 histogramas distintos, así que la caché no expulsa
+@lru_cache(maxsize=4096)
+def _clasificar_conteos(conteos: tuple) -> str:
+    i = _indice_de_conteos(conteos)
+    return CATEGORIAS[i] if i >= 0 else "otra"
+
+
+def clasificar_poker(conteos) -> str:
+    """Clasifica una mano a partir de sus conteos de dígitos (ver contar_digitos)."""
+    if isinstance(conteos, str):
+        # compatibilidad: también se acepta la cadena de dígitos, p. ej. "11223"
+        conteos = [conteos.count(d) for d in "0123456789"]
+    return _clasificar_conteos(tuple(conteos))
+
+
+clasificar_mano = clasificar_poker
+
+
+@lru_cache(maxsize=None)
+def _crear_nucleo(k: int):
+    """
+    Genera una versión de _nucleo_poker especializada para k: la escala queda
+    como constante (con la misma corrección que escalar) y la extracción de
+    los k dígitos se desenrolla.
+    """
+    pasos = ["h = bits[x % 10]"]
+    for _ in range(k - 1):
+        pasos += ["x //= 10", "h += bits[x % 10]"]
+    cuerpo = "\n".join(" " * 8 + paso for paso in pasos)
+    fuente = (
+        "def nucleo(numeros, bits=bits, tabla=tabla):\n"
+        "    indices = []\n"
+        "    agregar = indices.append\n"
+        "    for u in numeros:\n"
+        f"        x = int(u * {POTENCIAS[k]})\n"
+        f"        if (x + 1) / {POTENCIAS[k]} <= u:\n"
+        "            x += 1\n"
+        f"        elif x / {POTENCIAS[k]} > u:\n"
+        "            x -= 1\n"
+        f"{cuerpo}\n"
+        "        agregar(tabla[h])\n"
+        "    return indices\n"
+    )
+    espacio = {"bits": BITS_DIGITO, "tabla": HISTOGRAMA_A_INDICE}
+    exec(fuente, espacio)
+    return espacio["nucleo"]
+
+
+def _nucleo_poker(numeros, k: int = 5):
+    """Extrae, cuenta y clasifica cada número en una sola pasada; devuelve índices de categoría.
+
+    Los 10 contadores de dígitos van empaquetados en un solo entero, 4 bits por
+    dígito, y ese entero se busca directamente en HISTOGRAMA_A_INDICE.
+    """
+    return _crear_nucleo(k)(numeros)
+
+
+def _validar_k(k: int):
+    """Rechaza los k para los que no hay tabla de probabilidades."""
+    if k not in PROBS_POR_K:
+        raise ValueError(
+            f"La prueba de póker solo admite k en {sorted(PROBS_POR_K)} (k={k})."
+        )
+
+
+def _contar_categorias(indices) -> list:
+    """Cuenta en una sola pasada cuántos índices caen en cada categoría de CATEGORIAS."""
+    observadas = [0] * len(CATEGORIAS)
+    for i in indices:
+        observadas[i] += 1
+    return observadas
+
+
+def histograma_poker(numeros, k: int = 5) -> list:
+    """Cuenta cuántos números caen en cada categoría, alineado con CATEGORIAS."""
+    _validar_k(k)
+    return _contar_categorias(_nucleo_poker(numeros, k))
+
+
+def agrupar_categorias(cats, obs, esp, umbral=UMBRAL_ESPERADA):
+    """
+    Fusiona las categorías con E_i < umbral, tomándolas de menor a mayor E_i,
+    hasta que cada grupo alcance el umbral, pero sin bajar de dos grupos (la
+    prueba necesita al menos un grado de libertad). Devuelve (grupos, obs, esp)
+    donde cada grupo es una tupla de categorías.
+    """
+    grupos, g_obs, g_esp = [], [], []
+    actual, o, e = [], 0, 0.0
+    for i in sorted(range(len(cats)), key=esp.__getitem__):
+        actual.append(cats[i])
+        o += obs[i]
+        e += esp[i]
+        if e >= umbral:
+            grupos.append(tuple(actual))
+            g_obs.append(o)
+            g_esp.append(e)
+            actual, o, e = [], 0, 0.0
+    if actual:
+        # lo que sobra no llega al umbral: se une al último grupo formado
+        if grupos:
+            grupos[-1] += tuple(actual)
+            g_obs[-1] += o
+            g_esp[-1] += e
+        else:
+            grupos.append(tuple(actual))
+            g_obs.append(o)
+            g_esp.append(e)
+    if len(grupos) < 2 and len(cats) >= 2:
+        # muestra muy pequeña: se deja aparte la categoría de mayor E_i
+        # y se agrupan todas las demás
+        i = max(range(len(cats)), key=esp.__getitem__)
+        resto = [j for j in range(len(cats)) if j != i]
+        grupos = [tuple(cats[j] for j in resto), (cats[i],)]
+        g_obs = [sum(obs[j] for j in resto), obs[i]]
+        g_esp = [sum(esp[j] for j in resto), esp[i]]
+    return grupos, g_obs, g_esp
 
 
 def prueba_poker(numeros, k=5):
     """Realiza la prueba de póker y retorna todo lo necesario para imprimir tablas."""
+    _validar_k(k)
     n = len(numeros)
+    if n == 0:
+        raise ValueError("La prueba de póker necesita al menos un número.")
 
     # 1) Clasificar cada número
-    clasificaciones = []
-    for u in numeros:
-        d = extraer_digitos(u, k)
-        cat = clasificar_poker(d)
-        clasificaciones.append((u, cat))
+    indices = _nucleo_poker(numeros, k)
+    clasificaciones = [(u, CATEGORIAS[i]) for u, i in zip(numeros, indices)]
 
     # 2) Frecuencias observadas
-    conteo = Counter(cat for _, cat in clasificaciones)
-    # asegurar todas las categorías
-    for cat in PROBS.keys():
-        conteo.setdefault(cat, 0)
-
-    # 3) Frecuencias esperadas
-    esperadas = {cat: n * p for cat, p in PROBS.items()}
-
-    # 4) Chi-cuadrado
-    chi2 = 0.0
-    contribuciones = {}
-    for cat in PROBS.keys():
-        o = conteo[cat]
-        e = esperadas[cat]
-        c = (e - o) ** 2 / e if e > 0 else 0
-        chi2 += c
-        contribuciones[cat] = c
-
-    gl = len(PROBS) - 1
+    cats = CATEGORIAS_POR_K[k]
+    por_categoria = _contar_categorias(indices)
+    obs = [por_categoria[i] for i in INDICES_POR_K[k]]
+
+    # 3) Frecuencias esperadas, agrupando las clases con E_i pequeña
+    esp = [n * p for p in P_POR_K[k]]
+    grupos, obs, esp = agrupar_categorias(cats, obs, esp)
+    probs = [e / n for e in esp]
+
+    # 4) Chi-cuadrado: chi2 = d · (d / E), con d = E - O
+    d = list(map(operator.sub, esp, obs))
+    d_sobre_e = list(map(operator.truediv, d, esp))
+    contrib = list(map(operator.mul, d, d_sobre_e))
+    chi2 = math.fsum(contrib)
+
+    gl = len(grupos) - 1
     return {
         "clasificaciones": clasificaciones,
-        "observadas": conteo,
-        "esperadas": esperadas,
-        "contribuciones": contribuciones,
+        # columnas alineadas por grupo de categorías
+        "tabla": {
+            "cat": grupos,
+            "p": probs,
+            "O": obs,
+            "E": esp,
+            "contrib": contrib,
+        },
         "chi2": chi2,
         "gl": gl,
     }
 
+
+def formatear_numero(u: float, k: int = DECIMALES) -> str:
+    """Muestra u con sus primeros k decimales (ver escalar), los mismos que se clasifican."""
+    return f"0.{escalar(u, k):0{k}d}"
+
+
 def imprimir_encabezado():
     print("=" * 68)
     print("PRUEBA DE PÓKER - GENERADOR DE NÚMEROS ALEATORIOS".center(68))
@@ -121,48 +358,38 @@ def imprimir_encabezado():
 
 
 def imprimir_tabla_numeros(numeros, por_fila=6):
-    print("TABLA 1: NÚMEROS ALEATORIOS")
-    print("-" * 68)
-    fila = 1
-    for i in range(0, len(numeros), por_fila):
+    lineas = ["TABLA 1: NÚMEROS ALEATORIOS", "-" * 68]
+    for fila, i in enumerate(range(0, len(numeros), por_fila), start=1):
         chunk = numeros[i:i+por_fila]
-        print(f"Fila {fila:2d}: ", end="")
-        for u in chunk:
-            print(f"{u:.{DECIMALES}f}  ", end="")
-        print()
-        fila += 1
-    print("=" * 68)
+        valores = "".join(formatear_numero(u) + "  " for u in chunk)
+        lineas.append(f"Fila {fila:2d}: {valores}")
+    lineas.append("=" * 68)
+    sys.stdout.write("\n".join(lineas) + "\n")
 
 
 def imprimir_tabla_categorizados(datos, por_fila=6):
     """
     datos: lista de (numero, categoria)
     """
-    print("TABLA 2: NÚMEROS CATEGORIZADOS")
-    print("-" * 68)
-    fila = 1
-    for i in range(0, len(datos), por_fila):
+    lineas = ["TABLA 2: NÚMEROS CATEGORIZADOS", "-" * 68]
+    for fila, i in enumerate(range(0, len(datos), por_fila), start=1):
         chunk = datos[i:i+por_fila]
 
         # línea de números
-        print(f"Fila {fila:2d}: Números:   ", end="")
-        for u, _ in chunk:
-            print(f"{u:.{DECIMALES}f}  ", end="")
-        print()
+        valores = "".join(formatear_numero(u) + "  " for u, _ in chunk)
+        lineas.append(f"Fila {fila:2d}: Números:   {valores}")
 
-        # línea de categorías
-        print(f"       Categoría:", end=" ")
-        for _, cat in chunk:
-            nombre = DISPLAY_NAME.get(cat, cat).ljust(14)
-            print(nombre, end=" ")
-        print("\n")
-        fila += 1
-    print("=" * 68)
+        # línea de categorías, seguida de una línea en blanco
+        nombres = "".join(DISPLAY_NAME.get(cat, cat).ljust(14) + " " for _, cat in chunk)
+        lineas.append(f"       Categoría: {nombres}")
+        lineas.append("")
+    lineas.append("=" * 68)
+    sys.stdout.write("\n".join(lineas) + "\n")
 
 
 def imprimir_tabla_criticos(gl):
     alpha = 1 - CONFIANZA
-    chi2_crit = CHI2_CRITICO_95_G6  # en este ejemplo gl=6 fijo
+    chi2_crit = CHI2_CRITICO_95[gl]
     print("TABLA 3: VALORES CRÍTICOS DE CHI-CUADRADO")
     print("-" * 68)
     print(f"Nivel de confianza: {CONFIANZA*100:.1f}%")
@@ -173,17 +400,38 @@ def imprimir_tabla_criticos(gl):
     return chi2_crit
 
 
-def imprimir_tabla_frecuencias(obs, esp, contrib):
+def imprimir_tabla_frecuencias(tabla):
+    """
+    tabla: columnas "cat", "p", "O", "E" y "contrib" alineadas por grupo;
+    cada entrada de "cat" es la tupla de categorías fusionadas en ese grupo
+    """
+    filas = []
+    abreviadas = set()
+    for grupo, o, e, p, c in zip(tabla["cat"], tabla["O"], tabla["E"], tabla["p"], tabla["contrib"]):
+        grupo = sorted(grupo, key=DISPLAY_ORDER.index)
+        nombre = " + ".join(DISPLAY_NAME[cat] for cat in grupo)
+        if len(nombre) > ANCHO_NOMBRE_MAX:
+            nombre = "+".join(DISPLAY_ABREV[cat] for cat in grupo)
+            abreviadas.update(grupo)
+        filas.append((DISPLAY_ORDER.index(grupo[0]), nombre, o, e, p, c))
+    ancho = max(15, *(len(f[1]) for f in filas))
+
     print("TABLA 4: FRECUENCIAS OBSERVADAS Y ESPERADAS")
     print("-" * 68)
-    print(f"{'Categoría':15s} {'O_i':>6s} {'E_i':>8s} {'P_i':>8s} {'(E_i - O_i)^2/E_i':>18s}")
-    for cat in DISPLAY_ORDER:
-        nombre = DISPLAY_NAME[cat]
-        o = obs[cat]
-        e = esp[cat]
-        p = PROBS[cat]
-        c = contrib[cat]
-        print(f"{nombre:15s} {o:6d} {e:8.2f} {p:8.4f} {c:18.4f}")
+    print(f"{'Categoría':{ancho}s} {'O_i':>6s} {'E_i':>8s} {'P_i':>8s} {'(E_i - O_i)^2/E_i':>18s}")
+    for _, nombre, o, e, p, c in sorted(filas):
+        print(f"{nombre:{ancho}s} {o:6d} {e:8.2f} {p:8.4f} {c:18.4f}")
+    if abreviadas:
+        # leyenda de las abreviaturas, sin partir ninguna entrada entre líneas
+        print()
+        linea = "Grupos:"
+        for cat in sorted(abreviadas, key=DISPLAY_ORDER.index):
+            entrada = f" {DISPLAY_ABREV[cat]} = {DISPLAY_NAME[cat]};"
+            if len(linea) + len(entrada) > 68:
+                print(linea)
+                linea = " " * 7
+            linea += entrada
+        print(linea.rstrip(";"))
     print("=" * 68)
 
 
@@ -205,17 +453,13 @@ def imprimir_resultado(chi2, chi2_crit, gl):
 
 
 if __name__ == "__main__":
-    numeros = [random.random() for _ in range(N_NUMEROS)]
+    numeros = generar_numeros(N_NUMEROS)
     resultado = prueba_poker(numeros, k=DECIMALES)
     imprimir_encabezado()
     imprimir_tabla_numeros(numeros)
     imprimir_tabla_categorizados(resultado["clasificaciones"])
     chi2_crit = imprimir_tabla_criticos(resultado["gl"])
-    imprimir_tabla_frecuencias(
-        resultado["observadas"],
-        resultado["esperadas"],
-        resultado["contribuciones"],
-    )
+    imprimir_tabla_frecuencias(resultado["tabla"])
     imprimir_resultado(resultado["chi2"], chi2_crit, resultado["gl"])
 
 